@@ -1,22 +1,53 @@
 from __future__ import annotations
+import asyncio
 import logging
+import time
 import discord
 from discord.ext import commands
 from . import config
 from .db import DB
 from .services.private_rooms import rescan_and_repair
+from .services.load_shed import LoadShedder
+from .services.leader import LeaderElector, rescan_lease
+from .services.profiling import LoopWatchdog, rss_mb
+from .services.journal import SessionJournal
+from .services.snapshot import StateSnapshot
+from .services.members import MemberResolver
 
 INTENTS = discord.Intents.default()
 INTENTS.guilds = True
 INTENTS.members = True
 INTENTS.voice_states = True
 
+def _member_cache_options() -> dict:
+    # Экономный режим: без чанкинга гильдии, в кэше только те, кто в голосе;
+    # владельцы и прочие подгружаются лениво через MemberResolver.
+    if not config.LEAN_MEMBER_CACHE:
+        return {}
+    flags = discord.MemberCacheFlags.none()
+    flags.voice = True
+    return {"member_cache_flags": flags, "chunk_guilds_at_startup": False}
+
 class Bot(commands.Bot):
     def __init__(self, db: DB):
-        super().__init__(command_prefix="!", intents=INTENTS)
+        super().__init__(command_prefix="!", intents=INTENTS, **_member_cache_options())
         self.db = db
+        self.started_at = time.monotonic()
+        self.ready_seconds: float | None = None
+        self.member_resolver = MemberResolver()
+        self.shedder = LoadShedder(self, db)
+        self.leader = LeaderElector(self, db)
+        self.watchdog = LoopWatchdog()
+        self.journal = SessionJournal(db)
+        self.snapshot = StateSnapshot(self, db)
+        self._restored = False
 
     async def setup_hook(self):
+        self.shedder.start()
+        self.leader.start()
+        self.watchdog.start()
+        self.journal.start(open_rooms=sum(1 for _ in self.db.list_rooms()))
+
         # Слэш-команды для одной гильдии, если указан
         if config.GUILD_ID:
             guild = discord.Object(id=config.GUILD_ID)
@@ -29,16 +60,43 @@ class Bot(commands.Bot):
         await self.load_extension("private_vc_bot.cogs.voice_events")
         await self.load_extension("private_vc_bot.cogs.admin")
 
-        # восстановление состояния
-        await rescan_and_repair(self, self.db)
+    async def close(self):
+        self.shedder.stop()
+        self.leader.stop()
+        self.watchdog.stop()
+        self.journal.stop()
+        self.snapshot.stop()
+        await super().close()
 
     async def on_ready(self):
         logging.info(f"Logged in as {self.user} (ID: {self.user.id})")
+        # восстановление состояния — здесь, а не в setup_hook: там кэш гильдии ещё пуст
+        # гильдии известны только теперь — сразу заявляемся на их аренды
+        self.leader.beat()
+        if not self._restored:
+            self._restored = True
+            guild = self.get_guild(config.GUILD_ID) if config.GUILD_ID else None
+            if guild and config.LEAN_MEMBER_CACHE:
+                # владельцы из реестра — одной пачкой, а не по одному fetch_member
+                await self.member_resolver.warm(guild, [r.owner_id for r in self.db.list_rooms()])
+            data = self.snapshot.load()
+            if not (data and self.snapshot.restore(data)) and self.leader.holds(rescan_lease(config.GUILD_ID)):
+                # только лидер, иначе процессы будут драться за усыновление
+                asyncio.create_task(rescan_and_repair(self, self.db))
+            # периодическая запись — только после восстановления, чтобы не затереть снимок пустым
+            self.snapshot.start()
+            self.ready_seconds = time.monotonic() - self.started_at
+            logging.info("ready in %.1fs (member cache: %s, cached members: %s, lru: %s, rss: %.0f MB)",
+                         self.ready_seconds, "lean" if config.LEAN_MEMBER_CACHE else "full",
+                         sum(len(g.members) for g in self.guilds), len(self.member_resolver), rss_mb())
         try:
             await self.change_presence(activity=discord.Activity(type=discord.ActivityType.listening, name="за вашими приватками"))
         except Exception:
             pass
 
+    async def on_guild_join(self, guild: discord.Guild):
+        self.leader.beat()
+
 def main():
     config.require_token()
     db = DB(config.DB_PATH)
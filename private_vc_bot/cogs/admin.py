@@ -1,4 +1,5 @@
 from __future__ import annotations
+import io
 import discord
 from discord import app_commands
 from discord.ext import commands
@@ -6,6 +7,9 @@ from typing import Optional
 
 from .. import config
 from ..db import DB
+from ..services.leader import rescan_lease
+from ..services.members import resolve_member
+from ..services.profiling import rss_mb, sample_profile
 from ..services.private_rooms import post_panel, rescan_and_repair
 from ..ui.views import ControlView
 
@@ -29,7 +33,7 @@ class Admin(commands.Cog):
         if interaction.user.id != room.owner_id and not interaction.user.guild_permissions.manage_channels:
             return await interaction.followup.send("Только создатель может вызвать панель.", ephemeral=True)
 
-        owner = interaction.guild.get_member(room.owner_id) or interaction.user
+        owner = await resolve_member(self.bot, interaction.guild, room.owner_id) or interaction.user
         from ..services.private_rooms import upsert_panel
         await upsert_panel(self.db, interaction.guild, target, owner)
         return await interaction.followup.send("Панель обновлена.", ephemeral=True)
@@ -38,9 +42,50 @@ class Admin(commands.Cog):
     @app_commands.checks.has_permissions(manage_guild=True)
     async def rescan_cmd(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
+        leader = getattr(self.bot, "leader", None)
+        if leader and not leader.holds(rescan_lease(config.GUILD_ID)):
+            return await interaction.followup.send("Перескан выполняет другой процесс бота.", ephemeral=True)
         await rescan_and_repair(self.bot, self.db)
         await interaction.followup.send("Перескан завершён.", ephemeral=True)
 
+    @app_commands.command(name="priv-stats", description="(Админы) Статистика приваток")
+    @app_commands.checks.has_permissions(manage_guild=True)
+    async def stats_cmd(self, interaction: discord.Interaction):
+        # всё из роллапов: время ответа не зависит от длины истории
+        opened, closed, life_sum, life_n, current, peak = self.db.get_stats_totals()
+        opened_24h, peak_24h = self.db.get_stats_since(24)
+        avg_min = (life_sum / life_n / 60) if life_n else 0
+        top = self.db.top_owners(5)
+
+        emb = discord.Embed(title="📊 Статистика приваток", color=config.BRAND_COLOR)
+        emb.add_field(name="Сейчас открыто", value=str(current), inline=True)
+        emb.add_field(name="Пик одновременно", value=f"{peak} (за 24ч: {peak_24h})", inline=True)
+        emb.add_field(name="Создано", value=f"{opened} (за 24ч: {opened_24h})", inline=True)
+        emb.add_field(name="Средняя жизнь", value=f"{avg_min:.1f} мин", inline=True)
+        emb.add_field(name="Закрыто", value=str(closed), inline=True)
+        emb.add_field(name="Топ владельцев",
+                      value="\n".join(f"<@{uid}> — {n}" for uid, n in top) or "—", inline=False)
+        ready = getattr(self.bot, "ready_seconds", None)
+        emb.add_field(name="Процесс",
+                      value=f"кэш участников: {'lean' if config.LEAN_MEMBER_CACHE else 'full'}, "
+                            f"в кэше: {sum(len(g.members) for g in self.bot.guilds)}, "
+                            f"готов за: {f'{ready:.1f} с' if ready is not None else '—'}, "
+                            f"RSS: {rss_mb():.0f} МБ", inline=False)
+        await interaction.response.send_message(embed=emb, ephemeral=True)
+
+    @app_commands.command(name="priv-profile", description="(Админы) Снять семплирующий профиль event loop")
+    @app_commands.describe(seconds="Длительность, сек")
+    @app_commands.checks.has_permissions(manage_guild=True)
+    async def profile_cmd(self, interaction: discord.Interaction, seconds: app_commands.Range[int, 1, 300] = 10):
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        seconds = min(seconds, config.PROFILE_MAX_SEC)
+        data, samples = await sample_profile(seconds)
+        file = discord.File(io.BytesIO(data), filename="loop-profile.collapsed")
+        await interaction.followup.send(
+            f"Профиль за {seconds} с, семплов: {samples}. Формат collapsed-stack — "
+            f"открывается в speedscope или flamegraph.pl.",
+            file=file, ephemeral=True)
+
 async def setup(bot: commands.Bot):
     db = bot.get_cog("DB_COG").db if bot.get_cog("DB_COG") else getattr(bot, "db", None)
     if not db:
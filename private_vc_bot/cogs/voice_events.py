@@ -1,5 +1,6 @@
 from __future__ import annotations
 import asyncio
+from typing import Optional
 import discord
 from discord.ext import commands, tasks
 
@@ -7,6 +8,7 @@ from .. import config
 from ..db import DB
 from ..services import private_rooms as pr
 from ..services.anti_spam import check_can_create, after_created
+from ..services.leader import ANTISPAM, JOURNAL, delete_lease
 from ..services.logging import send_mod_log
 from ..services.private_rooms import upsert_panel
 
@@ -15,84 +17,125 @@ class VoiceEvents(commands.Cog):
         self.bot = bot
         self.db = db
         self.cleanup_empty_channels.start()
+        self.antispam_maintenance.start()
+        self.journal_retention.start()
 
     def cog_unload(self):
         self.cleanup_empty_channels.cancel()
+        self.antispam_maintenance.cancel()
+        self.journal_retention.cancel()
 
     # ---- EVENT ----
     @commands.Cog.listener()
     async def on_voice_state_update(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState):
         # Join hub -> create private
         if after and after.channel and after.channel.id == config.HUB_VOICE_CHANNEL_ID and (not before or before.channel != after.channel):
-            allowed, reason = check_can_create(self.db, member.id)
-            if not allowed:
-                # отправим ЛС и вернём обратно
-                try:
-                    await member.send(reason)
-                except Exception:
-                    pass
-                # попробуем вернуть в предыдущий канал
-                if before and before.channel:
-                    try:
-                        await member.move_to(before.channel, reason="Антиспам ограничение")
-                    except Exception:
-                        pass
-                else:
-                    try:
-                        await member.move_to(None, reason="Антиспам ограничение")
-                    except Exception:
-                        pass
-                return
-
-            voice = await pr.create_private_channel(member)
-            await pr.move_safe(member, voice)
-
-            # создать/зафиксировать панель
-            panel_channel_id, panel_message_id = await upsert_panel(self.db, member.guild, voice, member)
-
-            # запись в БД
-            self.db.add_room(
-                voice.id, member.id,
-                panel_channel_id=panel_channel_id or voice.id,
-                is_locked=0,
-                user_limit=voice.user_limit or config.DEFAULT_LIMIT,
-                preset_id=None,
-                panel_message_id=panel_message_id
-            )
-
-            # антиспам запись
-            after_created(self.db, member.id)
-
-            await send_mod_log(self.bot, title="🎧 Создана приватка",
-                               description=f"{voice.name} ({voice.id}) -> {member.mention}")
+            # уже есть живая приватка — просто возвращаем владельца в неё
+            own = pr.find_live_room(self.db, member)
+            if own:
+                await pr.move_safe(member, own)
+            else:
+                # повторный вход в хаб / replay события разделяют одно создание
+                voice = await pr.single_flight((member.guild.id, member.id), lambda: self._create_room(member, before))
+                if voice and member.voice and member.voice.channel and member.voice.channel.id == config.HUB_VOICE_CHANNEL_ID:
+                    await pr.move_safe(member, voice)
 
         # Auto-refresh панели при входе
         if after and after.channel:
             room = self.db.get_room(after.channel.id)
             if room:
-                owner = member.guild.get_member(room.owner_id) or member
-                asyncio.create_task(upsert_panel(self.db, member.guild, after.channel, owner))
+                self.bot.shedder.refresh_panel(after.channel)
 
         # Leaving any VC -> refresh panel or schedule delete
         if before and isinstance(before.channel, discord.VoiceChannel):
             room = self.db.get_room(before.channel.id)
             if room:
                 if len(before.channel.members) > 0:
-                    owner = before.channel.guild.get_member(room.owner_id) or before.channel.members[0]
-                    asyncio.create_task(upsert_panel(self.db, before.channel.guild, before.channel, owner))
+                    self.bot.shedder.refresh_panel(before.channel)
                 asyncio.create_task(pr.schedule_delete_if_empty(self.db, before.channel))
 
+    async def _create_room(self, member: discord.Member, before: discord.VoiceState) -> Optional[discord.VoiceChannel]:
+        allowed, reason = check_can_create(self.db, member.id)
+        if not allowed:
+            # отправим ЛС и вернём обратно
+            try:
+                await member.send(reason)
+            except Exception:
+                pass
+            # попробуем вернуть в предыдущий канал
+            if before and before.channel:
+                try:
+                    await member.move_to(before.channel, reason="Антиспам ограничение")
+                except Exception:
+                    pass
+            else:
+                try:
+                    await member.move_to(None, reason="Антиспам ограничение")
+                except Exception:
+                    pass
+            return
+
+        preset = self.db.get_default_preset(member.id)
+        voice = await pr.create_private_channel(member, preset)
+        await pr.move_safe(member, voice)
+
+        # создать/зафиксировать панель (под нагрузкой — отложить)
+        shed_panel = not self.bot.shedder.allows("panel")
+        if shed_panel:
+            panel_channel_id, panel_message_id = None, None
+        else:
+            panel_channel_id, panel_message_id = await upsert_panel(self.db, member.guild, voice, member)
+
+        # запись в БД
+        self.db.add_room(
+            voice.id, member.id,
+            panel_channel_id=panel_channel_id or voice.id,
+            is_locked=int(bool(preset and preset.is_locked)),
+            user_limit=voice.user_limit or config.DEFAULT_LIMIT,
+            preset_id=preset.name if preset else None,
+            panel_message_id=panel_message_id
+        )
+        if preset and preset.allow_list:
+            self.db.add_allowed(voice.id, [uid for uid in preset.allow_list if uid != member.id])
+
+        self.bot.journal.room_opened(voice.id, member.id)
+
+        if shed_panel:
+            self.bot.shedder.defer_panel(voice.id)
+
+        # антиспам запись
+        after_created(self.db, member.id)
+
+        await send_mod_log(self.bot, title="🎧 Создана приватка",
+                           description=f"{voice.name} ({voice.id}) -> {member.mention}")
+        return voice
+
     # ---- CLEANER ----
     @tasks.loop(minutes=2)
     async def cleanup_empty_channels(self):
         guild = self.bot.get_guild(config.GUILD_ID) if config.GUILD_ID else None
         if not guild:
             return
+        if not self.bot.leader.holds(delete_lease(guild.id)):
+            return
         for ch in guild.voice_channels:
             room = self.db.get_room(ch.id)
             if room and len(ch.members) == 0:
                 asyncio.create_task(pr.schedule_delete_if_empty(self.db, ch))
 
+    @tasks.loop(minutes=10)
+    async def antispam_maintenance(self):
+        if not self.bot.leader.holds(ANTISPAM):
+            return
+        self.db.clear_expired_blocks()
+        self.db.prune_creations(config.ANTISPAM_WINDOW_MIN)
+
+    @tasks.loop(hours=1)
+    async def journal_retention(self):
+        if not self.bot.leader.holds(JOURNAL):
+            return
+        self.db.prune_journal(config.JOURNAL_RETENTION_DAYS)
+
 async def setup(bot: commands.Bot):
     db = bot.get_cog("DB_COG").db if bot.get_cog("DB_COG") else getattr(bot, "db", None)
     if not db:
@@ -100,4 +143,16 @@ async def setup(bot: commands.Bot):
         from .. import config
         db = _DB(config.DB_PATH)
         bot.db = db
+    if not getattr(bot, "shedder", None):
+        from ..services.load_shed import LoadShedder
+        bot.shedder = LoadShedder(bot, db)
+        bot.shedder.start()
+    if not getattr(bot, "leader", None):
+        from ..services.leader import LeaderElector
+        bot.leader = LeaderElector(bot, db)
+        bot.leader.start()
+    if not getattr(bot, "journal", None):
+        from ..services.journal import SessionJournal
+        bot.journal = SessionJournal(db)
+        bot.journal.start(open_rooms=sum(1 for _ in db.list_rooms()))
     await bot.add_cog(VoiceEvents(bot, db))
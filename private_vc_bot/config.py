@@ -1,6 +1,7 @@
 
 from __future__ import annotations
 import os
+import socket
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -25,15 +26,52 @@ PANEL_TITLE: str = os.getenv("PANEL_TITLE", "⚙️ Управление при
 # Behavior
 DEFAULT_LIMIT: int = int(os.getenv("DEFAULT_LIMIT", "3"))
 DELETE_AFTER_EMPTY_SEC: int = int(os.getenv("DELETE_AFTER_EMPTY_SEC", "180"))  # 3 мин
+PRESET_CACHE_SIZE: int = int(os.getenv("PRESET_CACHE_SIZE", "1024"))  # LRU пресетов в памяти
 
 # Anti-spam
 ANTISPAM_THRESHOLD: int = int(os.getenv("ANTISPAM_THRESHOLD", "3"))      # сколько комнат за окно
 ANTISPAM_WINDOW_MIN: int = int(os.getenv("ANTISPAM_WINDOW_MIN", "10"))   # окно, минут
 ANTISPAM_COOLDOWN_MIN: int = int(os.getenv("ANTISPAM_COOLDOWN_MIN", "5"))# бан после достижения порога
 
+# Load shedding (деградация под 429/рейдами)
+SHED_QUEUE_DEPTH: int = int(os.getenv("SHED_QUEUE_DEPTH", "20"))     # фоновых REST-задач в полёте
+SHED_429_PER_MIN: int = int(os.getenv("SHED_429_PER_MIN", "5"))      # 429 за минуту
+SHED_LOOP_LAG_MS: int = int(os.getenv("SHED_LOOP_LAG_MS", "250"))    # лаг event loop, мс
+SHED_MODLOG_BUFFER: int = int(os.getenv("SHED_MODLOG_BUFFER", "200"))  # мод-логов в очереди на время деградации
+SHED_RECOVER_SEC: int = int(os.getenv("SHED_RECOVER_SEC", "30"))     # сколько ждать тишины перед снятием уровня
+
+# Scale-out: несколько процессов на одном DB_PATH
+INSTANCE_ID: str = os.getenv("INSTANCE_ID") or f"{socket.gethostname()}:{os.getpid()}"
+LEASE_TTL_SEC: int = int(os.getenv("LEASE_TTL_SEC", "15"))  # без heartbeat дольше — лидерство переходит
+
+# Diagnostics
+SLOW_CALLBACK_MS: int = int(os.getenv("SLOW_CALLBACK_MS", "200"))     # порог блокировки loop для лога (0 — выкл.)
+PROFILE_MAX_SEC: int = int(os.getenv("PROFILE_MAX_SEC", "60"))        # максимум для /priv-profile
+PROFILE_INTERVAL_MS: int = int(os.getenv("PROFILE_INTERVAL_MS", "5")) # шаг семплирования
+
+# Stats / session journal
+JOURNAL_FLUSH_SEC: int = int(os.getenv("JOURNAL_FLUSH_SEC", "10"))         # как часто писать пачку событий
+JOURNAL_BATCH: int = int(os.getenv("JOURNAL_BATCH", "100"))                # или раньше, если набралось столько
+JOURNAL_RETENTION_DAYS: int = int(os.getenv("JOURNAL_RETENTION_DAYS", "30"))  # сырой журнал; роллапы хранятся всегда
+
+# Member cache
+LEAN_MEMBER_CACHE: bool = bool(int(os.getenv("LEAN_MEMBER_CACHE", "0")))  # без чанкинга: кэш только голос + LRU
+MEMBER_LRU_SIZE: int = int(os.getenv("MEMBER_LRU_SIZE", "2048"))
+MEMBER_MISS_TTL_SEC: int = int(os.getenv("MEMBER_MISS_TTL_SEC", "300"))  # сколько помнить 404 от fetch_member
+
 # Storage
 DB_PATH: str = os.getenv("DB_PATH", "private_vc.sqlite3")
 
+# Warm restart
+# у каждого процесса свой: при явном INSTANCE_ID он входит в имя файла
+# (дефолтный hostname:pid меняется при каждом рестарте, поэтому в путь не идёт)
+_SNAPSHOT_TAG: str = "".join(c if c.isalnum() or c in "-_" else "_" for c in os.getenv("INSTANCE_ID", ""))
+SNAPSHOT_PATH: str = os.getenv("SNAPSHOT_PATH") or (
+    f"{DB_PATH}.{_SNAPSHOT_TAG}.snapshot.json" if _SNAPSHOT_TAG else f"{DB_PATH}.snapshot.json"
+)
+SNAPSHOT_EVERY_SEC: int = int(os.getenv("SNAPSHOT_EVERY_SEC", "60"))
+SNAPSHOT_MAX_AGE_SEC: int = int(os.getenv("SNAPSHOT_MAX_AGE_SEC", "900"))    # старше — полный перескан
+
 def require_token():
     if not DISCORD_TOKEN:
         raise SystemExit("DISCORD_TOKEN не задан в .env")
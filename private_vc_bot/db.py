@@ -1,9 +1,11 @@
 from __future__ import annotations
 import sqlite3
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Optional, Iterable, List, Tuple
 
-from .models import PrivateRoom
+from .models import PrivateRoom, RoomPreset
 from . import config
 
 ISO = "%Y-%m-%dT%H:%M:%S.%f"
@@ -11,6 +13,7 @@ ISO = "%Y-%m-%dT%H:%M:%S.%f"
 class DB:
     def __init__(self, path: str):
         self.conn = sqlite3.connect(path)
+        self._preset_cache: "OrderedDict[int, Optional[RoomPreset]]" = OrderedDict()
         self.conn.execute("PRAGMA journal_mode=WAL")
         self.conn.execute("PRAGMA foreign_keys=ON")
         self._migrate()
@@ -47,6 +50,68 @@ class DB:
             blocked_until  TEXT NOT NULL
         )
         """)
+        # аренды для выбора лидера между процессами на одном файле БД
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS leases (
+            name        TEXT PRIMARY KEY,
+            holder      TEXT NOT NULL,
+            expires_at  REAL NOT NULL
+        )
+        """)
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS presets (
+            owner_id      INTEGER NOT NULL,
+            name          TEXT NOT NULL,
+            name_template TEXT NOT NULL,
+            user_limit    INTEGER NOT NULL,
+            is_locked     INTEGER NOT NULL DEFAULT 0,
+            bitrate       INTEGER,
+            allow_list    TEXT NOT NULL DEFAULT '',
+            is_default    INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY(owner_id, name)
+        )
+        """)
+        # журнал сессий (append-only) и инкрементальные роллапы для /priv-stats
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS room_events (
+            id               INTEGER PRIMARY KEY AUTOINCREMENT,
+            ts               REAL NOT NULL,
+            kind             TEXT NOT NULL,
+            voice_channel_id INTEGER NOT NULL,
+            owner_id         INTEGER NOT NULL
+        )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS room_events_voice ON room_events(voice_channel_id, kind)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS room_events_ts ON room_events(ts)")
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS stats_hourly (
+            hour            INTEGER PRIMARY KEY,
+            opened          INTEGER NOT NULL DEFAULT 0,
+            closed          INTEGER NOT NULL DEFAULT 0,
+            lifetime_sum    REAL NOT NULL DEFAULT 0,
+            lifetime_n      INTEGER NOT NULL DEFAULT 0,
+            peak_concurrent INTEGER NOT NULL DEFAULT 0
+        )
+        """)
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS stats_totals (
+            id              INTEGER PRIMARY KEY CHECK (id = 1),
+            opened          INTEGER NOT NULL DEFAULT 0,
+            closed          INTEGER NOT NULL DEFAULT 0,
+            lifetime_sum    REAL NOT NULL DEFAULT 0,
+            lifetime_n      INTEGER NOT NULL DEFAULT 0,
+            current_open    INTEGER NOT NULL DEFAULT 0,
+            peak_concurrent INTEGER NOT NULL DEFAULT 0
+        )
+        """)
+        self.conn.execute("INSERT OR IGNORE INTO stats_totals(id) VALUES(1)")
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS stats_owners (
+            owner_id INTEGER PRIMARY KEY,
+            rooms    INTEGER NOT NULL DEFAULT 0
+        )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS stats_owners_rooms ON stats_owners(rooms DESC)")
         # мягкие ALTER'ы
         for stmt in (
                 "ALTER TABLE private_rooms ADD COLUMN preset_id TEXT",
@@ -111,9 +176,68 @@ class DB:
         self.conn.commit()
 
     def list_rooms(self) -> Iterable[PrivateRoom]:
-        cur = self.conn.execute("SELECT voice_channel_id, owner_id, panel_channel_id, is_locked, user_limit FROM private_rooms")
+        cur = self.conn.execute("SELECT voice_channel_id, owner_id, panel_channel_id, is_locked, user_limit, preset_id, panel_message_id "
+                                "FROM private_rooms")
         for row in cur.fetchall():
-            yield PrivateRoom(voice_channel_id=row[0], owner_id=row[1], panel_channel_id=row[2], is_locked=bool(row[3]), user_limit=row[4])
+            r = PrivateRoom(voice_channel_id=row[0], owner_id=row[1], panel_channel_id=row[2], is_locked=bool(row[3]), user_limit=row[4])
+            r.preset_id = row[5]
+            r.panel_message_id = row[6]
+            yield r
+
+    def list_rooms_by_owner(self, owner_id: int) -> List[PrivateRoom]:
+        cur = self.conn.execute(
+            "SELECT voice_channel_id, owner_id, panel_channel_id, is_locked, user_limit FROM private_rooms WHERE owner_id=?",
+            (owner_id,)
+        )
+        return [PrivateRoom(voice_channel_id=row[0], owner_id=row[1], panel_channel_id=row[2], is_locked=bool(row[3]), user_limit=row[4])
+                for row in cur.fetchall()]
+
+    # -------- Allowed members
+    def add_allowed(self, voice_id: int, user_ids: Iterable[int]):
+        self.conn.executemany("INSERT OR IGNORE INTO allowed_members(voice_channel_id, user_id) VALUES(?, ?)",
+                              [(voice_id, uid) for uid in user_ids])
+        self.conn.commit()
+
+    def list_allowed(self, voice_id: int) -> List[int]:
+        cur = self.conn.execute("SELECT user_id FROM allowed_members WHERE voice_channel_id=?", (voice_id,))
+        return [row[0] for row in cur.fetchall()]
+
+    # -------- Presets (с LRU-кэшем дефолтного пресета на пользователя)
+    def get_default_preset(self, owner_id: int) -> Optional[RoomPreset]:
+        if owner_id in self._preset_cache:
+            self._preset_cache.move_to_end(owner_id)
+            return self._preset_cache[owner_id]
+        cur = self.conn.execute(
+            "SELECT owner_id, name, name_template, user_limit, is_locked, bitrate, allow_list "
+            "FROM presets WHERE owner_id=? AND is_default=1", (owner_id,)
+        )
+        row = cur.fetchone()
+        preset = None
+        if row:
+            preset = RoomPreset(owner_id=row[0], name=row[1], name_template=row[2], user_limit=row[3],
+                                is_locked=bool(row[4]), bitrate=row[5],
+                                allow_list=[int(x) for x in row[6].split(",") if x])
+        self._preset_cache[owner_id] = preset
+        if len(self._preset_cache) > config.PRESET_CACHE_SIZE:
+            self._preset_cache.popitem(last=False)
+        return preset
+
+    def save_preset(self, preset: RoomPreset, make_default: bool = True):
+        if make_default:
+            self.conn.execute("UPDATE presets SET is_default=0 WHERE owner_id=?", (preset.owner_id,))
+        self.conn.execute(
+            "INSERT OR REPLACE INTO presets(owner_id, name, name_template, user_limit, is_locked, bitrate, allow_list, is_default) "
+            "VALUES(?,?,?,?,?,?,?,?)",
+            (preset.owner_id, preset.name, preset.name_template, preset.user_limit, int(preset.is_locked),
+             preset.bitrate, ",".join(str(x) for x in preset.allow_list), int(make_default))
+        )
+        self.conn.commit()
+        self._preset_cache.pop(preset.owner_id, None)
+
+    def delete_presets(self, owner_id: int):
+        self.conn.execute("DELETE FROM presets WHERE owner_id=?", (owner_id,))
+        self.conn.commit()
+        self._preset_cache.pop(owner_id, None)
 
     # -------- Anti-spam
     def record_creation(self, user_id: int):
@@ -141,3 +265,91 @@ class DB:
         now = datetime.utcnow().strftime(ISO)
         self.conn.execute("DELETE FROM blocks WHERE blocked_until < ?", (now,))
         self.conn.commit()
+
+    def prune_creations(self, older_than_minutes: int):
+        edge = (datetime.utcnow() - timedelta(minutes=older_than_minutes)).strftime(ISO)
+        self.conn.execute("DELETE FROM creations WHERE created_at < ?", (edge,))
+        self.conn.commit()
+
+    # -------- Session journal / stats
+    def apply_journal(self, events: List[Tuple[float, str, int, int]]):
+        """Дописать пачку событий (ts, kind, voice_id, owner_id) и обновить роллапы одной транзакцией."""
+        c = self.conn
+        for ts, kind, voice_id, owner_id in events:
+            hour = int(ts // 3600)
+            c.execute("INSERT INTO room_events(ts, kind, voice_channel_id, owner_id) VALUES(?,?,?,?)",
+                      (ts, kind, voice_id, owner_id))
+            # новый час стартует с уже открытыми комнатами: пик не меньше текущего числа открытых
+            c.execute("INSERT OR IGNORE INTO stats_hourly(hour, peak_concurrent) "
+                      "SELECT ?, current_open FROM stats_totals WHERE id=1", (hour,))
+            if kind == "open":
+                c.execute("UPDATE stats_totals SET opened=opened+1, current_open=current_open+1, "
+                          "peak_concurrent=MAX(peak_concurrent, current_open+1) WHERE id=1")
+                current = c.execute("SELECT current_open FROM stats_totals WHERE id=1").fetchone()[0]
+                c.execute("UPDATE stats_hourly SET opened=opened+1, peak_concurrent=MAX(peak_concurrent, ?) "
+                          "WHERE hour=?", (current, hour))
+                c.execute("INSERT INTO stats_owners(owner_id, rooms) VALUES(?, 1) "
+                          "ON CONFLICT(owner_id) DO UPDATE SET rooms=rooms+1", (owner_id,))
+            else:
+                # время жизни — по последнему open этой комнаты (если не срезан ретенцией)
+                row = c.execute("SELECT ts FROM room_events WHERE voice_channel_id=? AND kind='open' "
+                                "ORDER BY id DESC LIMIT 1", (voice_id,)).fetchone()
+                life, n = (ts - row[0], 1) if row else (0.0, 0)
+                c.execute("UPDATE stats_totals SET closed=closed+1, current_open=MAX(current_open-1, 0), "
+                          "lifetime_sum=lifetime_sum+?, lifetime_n=lifetime_n+? WHERE id=1", (life, n))
+                c.execute("UPDATE stats_hourly SET closed=closed+1, lifetime_sum=lifetime_sum+?, "
+                          "lifetime_n=lifetime_n+? WHERE hour=?", (life, n, hour))
+        c.commit()
+
+    def reset_current_open(self, count: int):
+        self.conn.execute("UPDATE stats_totals SET current_open=? WHERE id=1", (count,))
+        self.conn.commit()
+
+    def get_stats_totals(self) -> Tuple[int, int, float, int, int, int]:
+        """(opened, closed, lifetime_sum, lifetime_n, current_open, peak_concurrent)"""
+        cur = self.conn.execute("SELECT opened, closed, lifetime_sum, lifetime_n, current_open, peak_concurrent "
+                                "FROM stats_totals WHERE id=1")
+        return tuple(cur.fetchone())
+
+    def get_stats_since(self, hours: int) -> Tuple[int, int]:
+        """(opened, peak_concurrent) за последние `hours` часов — не больше `hours` строк роллапа.
+        Часы без событий в роллапе не появляются, но открытые сейчас комнаты открыты и в окне,
+        поэтому пик не меньше current_open."""
+        edge = int(time.time() // 3600) - hours + 1
+        cur = self.conn.execute("SELECT COALESCE(SUM(opened), 0), "
+                                "MAX(COALESCE(MAX(peak_concurrent), 0), (SELECT current_open FROM stats_totals WHERE id=1)) "
+                                "FROM stats_hourly WHERE hour>=?", (edge,))
+        row = cur.fetchone()
+        return row[0], row[1]
+
+    def top_owners(self, limit: int = 5) -> List[Tuple[int, int]]:
+        cur = self.conn.execute("SELECT owner_id, rooms FROM stats_owners ORDER BY rooms DESC LIMIT ?", (limit,))
+        return [(row[0], row[1]) for row in cur.fetchall()]
+
+    def prune_journal(self, older_than_days: int):
+        edge = time.time() - older_than_days * 86400
+        self.conn.execute("DELETE FROM room_events WHERE ts < ?", (edge,))
+        self.conn.commit()
+
+    # -------- Leases
+    def try_acquire_lease(self, name: str, holder: str, ttl_sec: float) -> bool:
+        """Взять или продлить аренду. Атомарно: чужую живую аренду не перехватываем."""
+        now = time.time()
+        self.conn.execute(
+            "INSERT INTO leases(name, holder, expires_at) VALUES(?,?,?) "
+            "ON CONFLICT(name) DO UPDATE SET holder=excluded.holder, expires_at=excluded.expires_at "
+            "WHERE leases.holder=excluded.holder OR leases.expires_at<?",
+            (name, holder, now + ttl_sec, now)
+        )
+        self.conn.commit()
+        cur = self.conn.execute("SELECT holder FROM leases WHERE name=?", (name,))
+        row = cur.fetchone()
+        return bool(row) and row[0] == holder
+
+    def release_leases(self, holder: str):
+        self.conn.execute("DELETE FROM leases WHERE holder=?", (holder,))
+        self.conn.commit()
+
+    def list_leases(self) -> List[Tuple[str, str, float]]:
+        cur = self.conn.execute("SELECT name, holder, expires_at FROM leases ORDER BY name")
+        return [(row[0], row[1], row[2]) for row in cur.fetchall()]
@@ -1,7 +1,7 @@
 
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import List, Optional
 
 @dataclass
 class PrivateRoom:
@@ -10,3 +10,13 @@ class PrivateRoom:
     panel_channel_id: Optional[int]  # может быть ID voice (Text-in-Voice) или текстового канала
     is_locked: bool
     user_limit: int
+
+@dataclass
+class RoomPreset:
+    owner_id: int
+    name: str
+    name_template: str               # без префикса "🎧 ", {name} — ник владельца
+    user_limit: int
+    is_locked: bool
+    bitrate: Optional[int] = None
+    allow_list: List[int] = field(default_factory=list)
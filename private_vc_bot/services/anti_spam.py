@@ -6,8 +6,8 @@ from .. import config
 from ..db import DB
 
 def check_can_create(db: DB, user_id: int) -> Tuple[bool, Optional[str]]:
-    """Return (allowed, reason_if_denied). Also sets cooldown if needed."""
-    db.clear_expired_blocks()
+    """Return (allowed, reason_if_denied). Also sets cooldown if needed.
+    Expired blocks are cleared by the leader's maintenance job, not here."""
     blocked_until = db.get_block_until(user_id)
     if blocked_until and blocked_until > datetime.utcnow():
         wait = int((blocked_until - datetime.utcnow()).total_seconds() // 60) + 1
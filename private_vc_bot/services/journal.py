@@ -0,0 +1,66 @@
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from typing import List, Optional, Tuple
+
+from .. import config
+from ..db import DB
+
+
+class SessionJournal:
+    """Журнал открытий/закрытий приваток.
+
+    События копятся в памяти и пишутся пачкой раз в JOURNAL_FLUSH_SEC (или по
+    достижении JOURNAL_BATCH) — вместе с инкрементальным обновлением роллапов,
+    поэтому /priv-stats никогда не сканирует сырой журнал.
+    """
+
+    def __init__(self, db: DB):
+        self.db = db
+        self._buf: List[Tuple[float, str, int, int]] = []
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, open_rooms: int):
+        if self._task:
+            return
+        # после рестарта счётчик открытых сверяем с реестром
+        self.db.reset_current_open(open_rooms)
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self.flush()
+
+    def room_opened(self, voice_id: int, owner_id: int):
+        self._add("open", voice_id, owner_id)
+
+    def room_closed(self, voice_id: int, owner_id: int):
+        self._add("close", voice_id, owner_id)
+
+    def _add(self, kind: str, voice_id: int, owner_id: int):
+        self._buf.append((time.time(), kind, voice_id, owner_id))
+        if self._wake and len(self._buf) >= config.JOURNAL_BATCH:
+            self._wake.set()
+
+    def flush(self):
+        if not self._buf:
+            return
+        batch, self._buf = self._buf, []
+        try:
+            self.db.apply_journal(batch)
+        except Exception:
+            logging.exception("journal: flush of %s events failed", len(batch))
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=config.JOURNAL_FLUSH_SEC)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            self.flush()
@@ -0,0 +1,112 @@
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+
+from .. import config
+from ..db import DB
+
+# Синглтон-задачи, которые должен выполнять ровно один процесс
+ANTISPAM = "antispam"
+JOURNAL = "journal"
+
+
+def delete_lease(guild_id: int) -> str:
+    """Аренда на расписание удаления пустых приваток конкретной гильдии."""
+    return f"delete:{guild_id}"
+
+
+def rescan_lease(guild_id: int) -> str:
+    """Аренда на перескан/усыновление конкретной гильдии."""
+    return f"rescan:{guild_id}"
+
+
+class LeaderElector:
+    """Выбор лидера через аренды в общей SQLite.
+
+    Каждый процесс раз в LEASE_TTL_SEC/3 продлевает свои аренды и пытается забрать
+    просроченные. Аренда считается нашей только до локального срока — если heartbeat
+    застрял, процесс сам перестаёт считать себя лидером раньше, чем её заберут другие.
+    """
+
+    def __init__(self, bot, db: DB, instance_id: Optional[str] = None):
+        self.bot = bot
+        self.db = db
+        self.instance_id = instance_id or config.INSTANCE_ID
+        self._held: Dict[str, float] = {}  # name -> локальный срок
+        self._task: Optional[asyncio.Task] = None
+
+    def lease_names(self) -> List[str]:
+        names = [ANTISPAM, JOURNAL]
+        # гильдейские аренды — только для гильдий, которые видит этот процесс (его шарды);
+        # до on_ready список пуст, поэтому после него и on_guild_join нужен beat()
+        for g in getattr(self.bot, "guilds", None) or []:
+            names += [delete_lease(g.id), rescan_lease(g.id)]
+        return names
+
+    def holds(self, name: str) -> bool:
+        return self._held.get(name, 0) > time.time()
+
+    def beat(self):
+        ttl = config.LEASE_TTL_SEC
+        for name in self.lease_names():
+            started = time.time()
+            try:
+                ok = self.db.try_acquire_lease(name, self.instance_id, ttl)
+            except Exception:
+                logging.exception("leader: heartbeat failed for %s", name)
+                ok = False
+            if ok:
+                if name not in self._held:
+                    logging.info("leader: %s acquired %s", self.instance_id, name)
+                self._held[name] = started + ttl
+            elif self._held.pop(name, None) is not None:
+                logging.warning("leader: %s lost %s", self.instance_id, name)
+
+    def start(self):
+        if self._task:
+            return
+        # первый heartbeat синхронно, чтобы задачи при старте уже знали, кто лидер
+        self.beat()
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        # отдаём аренды сразу, чтобы соседи подхватили без ожидания TTL
+        try:
+            self.db.release_leases(self.instance_id)
+        except Exception:
+            logging.exception("leader: release failed")
+        self._held.clear()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(max(config.LEASE_TTL_SEC / 3, 1))
+            self.beat()
+
+
+if __name__ == "__main__":
+    # Локальная проверка: запусти несколько копий на одном файле БД и
+    # убивай/перезапускай их — лидерство переходит в пределах LEASE_TTL_SEC.
+    #   python -m private_vc_bot.services.leader
+    import os
+    logging.basicConfig(level=logging.INFO)
+    elector = LeaderElector(bot=None, db=DB(config.DB_PATH), instance_id=f"demo:{os.getpid()}")
+
+    async def _demo():
+        elector.start()
+        try:
+            while True:
+                held = [n for n in elector.lease_names() if elector.holds(n)]
+                print(f"{elector.instance_id}: {held or '-'}", flush=True)
+                await asyncio.sleep(2)
+        finally:
+            elector.stop()
+
+    try:
+        asyncio.run(_demo())
+    except KeyboardInterrupt:
+        pass
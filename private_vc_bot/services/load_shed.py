@@ -0,0 +1,233 @@
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Iterable, Optional, Set
+
+import discord
+from .. import config
+from ..db import DB
+from .members import resolve_member
+
+# Уровни деградации
+NORMAL, DEGRADED, CRITICAL = 0, 1, 2
+
+# Какая второстепенная работа приостанавливается на каждом уровне.
+# Создание приваток из хаба и переносы не приостанавливаются никогда.
+_SUSPENDED = {
+    NORMAL: frozenset(),
+    DEGRADED: frozenset({"panel", "modlog"}),
+    CRITICAL: frozenset({"panel", "modlog", "adopt"}),
+}
+
+_TICK_SEC = 1.0
+
+
+class _RateLimitHandler(logging.Handler):
+    """Считает 429 по предупреждениям discord.http — сама библиотека их наружу не отдаёт."""
+
+    def __init__(self, shedder: "LoadShedder"):
+        super().__init__(logging.WARNING)
+        self.shedder = shedder
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            msg = record.getMessage()
+        except Exception:
+            return
+        if "429" in msg or "rate limited" in msg:
+            self.shedder.note_rate_limit()
+
+
+class LoadShedder:
+    """Контроллер деградации под нагрузкой.
+
+    Следит за глубиной очереди фоновых REST-задач, частотой 429 и лагом event loop.
+    При превышении порогов приостанавливает второстепенную работу, а после
+    восстановления делает ровно одно обновление панели на каждую затронутую приватку.
+    """
+
+    def __init__(self, bot, db: DB):
+        self.bot = bot
+        self.db = db
+        self.level = NORMAL
+        self.loop_lag_ms = 0.0
+        self._hits: deque[float] = deque()
+        self._tasks: Set[asyncio.Task] = set()
+        self._pending: Set[int] = set()  # voice_channel_id с отложенным обновлением панели
+        self._adopt_pending = False      # усыновление сирот отложено из-за CRITICAL
+        self._modlogs: deque = deque(maxlen=max(config.SHED_MODLOG_BUFFER, 1))
+        self._modlogs_dropped = 0
+        self._calm_since: Optional[float] = None
+        self._monitor: Optional[asyncio.Task] = None
+        self._handler = _RateLimitHandler(self)
+
+    # ---- жизненный цикл
+    def start(self):
+        if self._monitor:
+            return
+        logging.getLogger("discord.http").addHandler(self._handler)
+        self._monitor = asyncio.create_task(self._run())
+
+    def stop(self):
+        logging.getLogger("discord.http").removeHandler(self._handler)
+        if self._monitor:
+            self._monitor.cancel()
+            self._monitor = None
+
+    # ---- сигналы
+    def note_rate_limit(self):
+        self._hits.append(time.monotonic())
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._tasks)
+
+    def rate_limits_per_min(self) -> int:
+        edge = time.monotonic() - 60
+        while self._hits and self._hits[0] < edge:
+            self._hits.popleft()
+        return len(self._hits)
+
+    # ---- API для обработчиков
+    def allows(self, kind: str) -> bool:
+        return kind not in _SUSPENDED[self.level]
+
+    def spawn(self, coro: Awaitable) -> asyncio.Task:
+        """create_task с учётом в глубине очереди."""
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def defer_panel(self, voice_id: int):
+        self._pending.add(voice_id)
+
+    def defer_modlog(self, title: str, description: str, fields):
+        if len(self._modlogs) == self._modlogs.maxlen:
+            self._modlogs_dropped += 1  # вытесняется самая старая запись
+        self._modlogs.append((title, description, fields))
+
+    def defer_adopt(self):
+        self._adopt_pending = True
+
+    def refresh_panels(self, voice_ids: Iterable[int]):
+        """Пачка обновлений — одной последовательной задачей, а не сотней параллельных."""
+        self._pending.update(voice_ids)
+        if self.allows("panel") and self._pending:
+            ids, self._pending = list(self._pending), set()
+            self.spawn(self._catch_up(ids))
+
+    def refresh_panel(self, voice: discord.VoiceChannel):
+        """Обновить панель сейчас или отложить до выхода из деградации."""
+        if not self.allows("panel"):
+            self.defer_panel(voice.id)
+            return
+        self._pending.discard(voice.id)
+        self.spawn(self._refresh(voice.guild, voice.id))
+
+    # ---- внутреннее
+    async def _refresh(self, guild: discord.Guild, voice_id: int):
+        from .private_rooms import upsert_panel
+        ch = guild.get_channel(voice_id)
+        room = self.db.get_room(voice_id)
+        if not isinstance(ch, discord.VoiceChannel) or not room:
+            return
+        owner = await resolve_member(self.bot, guild, room.owner_id) or (ch.members[0] if ch.members else None)
+        if not owner:
+            return
+        try:
+            await upsert_panel(self.db, guild, ch, owner)
+        except Exception:
+            logging.exception("load_shed: refresh failed for %s", voice_id)
+
+    async def _adopt(self):
+        from .private_rooms import adopt_orphans
+        guild = self.bot.get_guild(config.GUILD_ID) if config.GUILD_ID else None
+        if not guild:
+            return
+        if not self.allows("adopt"):
+            self._adopt_pending = True
+            return
+        try:
+            adopted = await adopt_orphans(self.bot, self.db, guild)
+        except Exception:
+            logging.exception("load_shed: deferred adoption failed")
+            return
+        for ch in adopted:
+            self.refresh_panel(ch)
+
+    async def _flush_modlogs(self):
+        from .logging import send_mod_log
+        if self._modlogs_dropped:
+            dropped, self._modlogs_dropped = self._modlogs_dropped, 0
+            logging.warning("load_shed: %s mod-log entries dropped while degraded (buffer full)", dropped)
+            try:
+                await send_mod_log(self.bot, title="⚠️ Часть мод-логов потеряна",
+                                   description=f"Под нагрузкой переполнился буфер: потеряно записей — {dropped}.")
+            except Exception:
+                logging.exception("load_shed: mod-log flush failed")
+        while self._modlogs and self.allows("modlog"):
+            title, description, fields = self._modlogs.popleft()
+            try:
+                await send_mod_log(self.bot, title=title, description=description, fields=fields)
+            except Exception:
+                logging.exception("load_shed: mod-log flush failed")
+
+    async def _catch_up(self, voice_ids: Iterable[int]):
+        guild = self.bot.get_guild(config.GUILD_ID) if config.GUILD_ID else None
+        if not guild:
+            return
+        # последовательно, чтобы догоняющие обновления сами не устроили всплеск 429
+        for voice_id in voice_ids:
+            if not self.allows("panel"):
+                self._pending.add(voice_id)
+                continue
+            await self._refresh(guild, voice_id)
+
+    def _target_level(self) -> int:
+        pressure = max(
+            self.queue_depth / max(config.SHED_QUEUE_DEPTH, 1),
+            self.rate_limits_per_min() / max(config.SHED_429_PER_MIN, 1),
+            self.loop_lag_ms / max(config.SHED_LOOP_LAG_MS, 1),
+        )
+        if pressure >= 2:
+            return CRITICAL
+        if pressure >= 1:
+            return DEGRADED
+        return NORMAL
+
+    def _set_level(self, level: int):
+        if level == self.level:
+            return
+        logging.warning("load_shed: level %s -> %s (queue=%s, 429/min=%s, lag=%.0fms)",
+                        self.level, level, self.queue_depth, len(self._hits), self.loop_lag_ms)
+        self.level = level
+        if self.allows("modlog") and (self._modlogs or self._modlogs_dropped):
+            self.spawn(self._flush_modlogs())
+        if self.allows("adopt") and self._adopt_pending:
+            self._adopt_pending = False
+            self.spawn(self._adopt())
+        if self._pending:
+            self.refresh_panels(())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(_TICK_SEC)
+            self.loop_lag_ms = max(0.0, (loop.time() - started - _TICK_SEC) * 1000)
+
+            target = self._target_level()
+            now = time.monotonic()
+            if target >= self.level:
+                # эскалация — сразу
+                self._calm_since = None
+                self._set_level(target)
+            elif self._calm_since is None:
+                self._calm_since = now
+            elif now - self._calm_since >= config.SHED_RECOVER_SEC:
+                # восстановление — по ступеньке, с гистерезисом
+                self._calm_since = now
+                self._set_level(self.level - 1)
@@ -7,6 +7,11 @@ from .. import config
 async def send_mod_log(bot, *, title: str, description: str = "", fields: Optional[Iterable[Tuple[str, str, bool]]] = None):
     if not config.LOG_CHANNEL_ID:
         return
+    shedder = getattr(bot, "shedder", None)
+    if shedder and not shedder.allows("modlog"):
+        # под нагрузкой мод-логи копятся в ограниченной очереди и досылаются после восстановления
+        shedder.defer_modlog(title, description, list(fields) if fields else None)
+        return
     ch = bot.get_channel(config.LOG_CHANNEL_ID)
     if not isinstance(ch, (discord.TextChannel, discord.Thread)):
         return
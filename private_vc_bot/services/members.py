@@ -0,0 +1,96 @@
+from __future__ import annotations
+import logging
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+import discord
+from .. import config
+
+
+class MemberResolver:
+    """Ограниченный LRU участников поверх кэша гильдии.
+
+    В экономном режиме (LEAN_MEMBER_CACHE) discord.py держит только тех, кто
+    сейчас в голосе; владельцы приваток и прочие участники подтягиваются сюда
+    по требованию — через гейтвей пачками или REST по одному.
+    """
+
+    def __init__(self, size: Optional[int] = None):
+        self.size = size or config.MEMBER_LRU_SIZE
+        self._lru: "OrderedDict[Tuple[int, int], discord.Member]" = OrderedDict()
+        # отрицательный кэш: (guild_id, user_id) -> до какого времени не спрашивать REST снова
+        self._missing: "OrderedDict[Tuple[int, int], float]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    def _put(self, member: discord.Member):
+        key = (member.guild.id, member.id)
+        self._missing.pop(key, None)
+        self._lru[key] = member
+        self._lru.move_to_end(key)
+        if len(self._lru) > self.size:
+            self._lru.popitem(last=False)
+
+    def get(self, guild: discord.Guild, user_id: int) -> Optional[discord.Member]:
+        """Без сетевых запросов: кэш гильдии, затем LRU."""
+        member = guild.get_member(user_id)
+        if member:
+            return member
+        key = (guild.id, user_id)
+        member = self._lru.get(key)
+        if member:
+            self._lru.move_to_end(key)
+        return member
+
+    async def resolve(self, guild: discord.Guild, user_id: int) -> Optional[discord.Member]:
+        member = self.get(guild, user_id)
+        if member:
+            return member
+        key = (guild.id, user_id)
+        until = self._missing.get(key)
+        if until is not None:
+            if until > time.monotonic():
+                return None  # недавно был 404 — не дёргаем REST на каждом voice-событии
+            del self._missing[key]
+        try:
+            member = await guild.fetch_member(user_id)
+        except discord.NotFound:
+            self._missing[key] = time.monotonic() + config.MEMBER_MISS_TTL_SEC
+            if len(self._missing) > self.size:
+                self._missing.popitem(last=False)
+            return None
+        except discord.HTTPException:
+            logging.info("members: fetch_member failed for %s", user_id)
+            return None
+        self._put(member)
+        return member
+
+    async def warm(self, guild: discord.Guild, user_ids: Iterable[int]):
+        """Подтянуть пачку участников одним гейтвей-запросом на каждые 100 id."""
+        missing = [uid for uid in set(user_ids) if not self.get(guild, uid)]
+        for i in range(0, len(missing), 100):
+            try:
+                members = await guild.query_members(user_ids=missing[i:i + 100], cache=False)
+            except Exception:
+                logging.exception("members: query_members failed")
+                continue
+            for member in members:
+                self._put(member)
+
+
+async def resolve_member(client, guild: discord.Guild, user_id: int) -> Optional[discord.Member]:
+    """guild.get_member с ленивой подгрузкой через резолвер бота, если он есть."""
+    resolver = getattr(client, "member_resolver", None)
+    if resolver:
+        return await resolver.resolve(guild, user_id)
+    return guild.get_member(user_id)
+
+
+def cached_member(client, guild: discord.Guild, user_id: int) -> Optional[discord.Member]:
+    """Как resolve_member, но только из кэшей, без запросов."""
+    resolver = getattr(client, "member_resolver", None)
+    if resolver:
+        return resolver.get(guild, user_id)
+    return guild.get_member(user_id)
@@ -1,11 +1,16 @@
 from __future__ import annotations
-from typing import Optional
+import asyncio
+import hashlib
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
 
 import discord
 from .. import config
 from ..db import DB
+from ..models import RoomPreset
 from ..utils.naming import sanitize_name
 from ..services.logging import send_mod_log
+from ..services.members import resolve_member
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from ..ui.views import ControlView
@@ -16,8 +21,39 @@ PANEL_DESC = (
     "• 👥 Лимит мест\n"
     "• 👢 Кик участника\n"
     "• 👑 Передать права\n"
+    "• 💾 Сохранить настройки как пресет для новых приваток\n"
 )
 
+# (guild_id, user_id) -> задача создания, которая сейчас в полёте
+_inflight: Dict[Tuple[int, int], asyncio.Task] = {}
+
+async def single_flight(key: Tuple[int, int], factory: Callable[[], Awaitable]):
+    """Одновременные вызовы с одним ключом разделяют одну задачу и её результат."""
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(factory())
+        _inflight[key] = task
+        task.add_done_callback(lambda _t: _inflight.pop(key, None))
+    # shield: отмена одного ожидающего не должна отменять создание для остальных
+    return await asyncio.shield(task)
+
+def find_live_room(db: DB, member: discord.Member) -> Optional[discord.VoiceChannel]:
+    """Существующая приватка пользователя, если её канал ещё жив."""
+    for room in db.list_rooms_by_owner(member.id):
+        ch = member.guild.get_channel(room.voice_channel_id)
+        if isinstance(ch, discord.VoiceChannel):
+            return ch
+    return None
+
+# voice_channel_id -> хэш последнего отрисованного содержимого панели / срок удаления (unix)
+panel_hashes: Dict[int, str] = {}
+delete_deadlines: Dict[int, float] = {}
+
+def panel_hash(voice: discord.VoiceChannel, owner: discord.Member) -> str:
+    """Хэш всего, от чего зависит панель: если он не изменился, панель не нужно редактировать."""
+    state = (owner.id, tuple((m.id, m.display_name) for m in voice.members))
+    return hashlib.sha1(repr(state).encode("utf-8")).hexdigest()[:16]
+
 def _build_view(db: DB, voice: discord.VoiceChannel, owner: discord.Member):
     # ленивый импорт, чтобы не было циклического
     from ..ui.views import ControlView
@@ -45,6 +81,7 @@ async def upsert_panel(db: DB, guild: discord.Guild, voice: discord.VoiceChannel
             if isinstance(ch, (discord.VoiceChannel, discord.TextChannel, discord.Thread)):
                 msg = await ch.fetch_message(room.panel_message_id)
                 await msg.edit(embed=embed, view=view)
+                panel_hashes[voice.id] = panel_hash(voice, owner)
                 return (ch.id, msg.id)
         except Exception as e:
             logging.info("upsert_panel: old message not found/editable -> recreate (%s)", e)
@@ -54,6 +91,7 @@ async def upsert_panel(db: DB, guild: discord.Guild, voice: discord.VoiceChannel
         msg = await voice.send(embed=embed, view=view)
         db.set_panel_channel(voice.id, voice.id)
         db.set_panel_message(voice.id, msg.id)
+        panel_hashes[voice.id] = panel_hash(voice, owner)
         return (voice.id, msg.id)
     except Exception as e:
         logging.exception("upsert_panel: voice.send failed in %s (%s)", voice.name, voice.id)
@@ -75,6 +113,7 @@ async def upsert_panel(db: DB, guild: discord.Guild, voice: discord.VoiceChannel
             msg = await text.send(embed=embed, view=view)
             db.set_panel_channel(voice.id, text.id)
             db.set_panel_message(voice.id, msg.id)
+            panel_hashes[voice.id] = panel_hash(voice, owner)
             return (text.id, msg.id)
         except Exception:
             return (None, None)
@@ -101,13 +140,49 @@ async def ensure_category(guild: discord.Guild) -> discord.CategoryChannel:
         cat = await guild.create_category("🔑 Приватки")
     return cat
 
-async def create_private_channel(member: discord.Member) -> discord.VoiceChannel:
+ROOM_PREFIX = "🎧 "
+
+def render_room_name(member: discord.Member, preset: Optional[RoomPreset] = None) -> str:
+    nick = sanitize_name(member.display_name)
+    if not preset:
+        return f"{ROOM_PREFIX}{nick}"
+    try:
+        name = preset.name_template.format(name=nick)
+    except (KeyError, IndexError, ValueError):
+        name = nick
+    return f"{ROOM_PREFIX}{name.strip() or nick}"[:100]
+
+def preset_from_room(db: DB, voice: discord.VoiceChannel, owner: discord.Member, is_locked: bool) -> RoomPreset:
+    """Снимок текущего состояния приватки как пресет владельца."""
+    name = voice.name[len(ROOM_PREFIX):] if voice.name.startswith(ROOM_PREFIX) else voice.name
+    nick = sanitize_name(owner.display_name)
+    template = name.replace("{", "{{").replace("}", "}}")
+    if nick and nick in name:
+        template = template.replace(nick, "{name}", 1)
+    # allow-list — участники с явным connect=True в оверрайтах (кроме владельца и бота)
+    allow = set(db.list_allowed(voice.id))
+    skip = {owner.id, voice.guild.me.id}
+    for target, ow in voice.overwrites.items():
+        if isinstance(target, discord.Role) or target.id in skip:
+            continue
+        if ow.connect is True:
+            allow.add(target.id)
+    return RoomPreset(
+        owner_id=owner.id, name="default", name_template=template,
+        user_limit=voice.user_limit, is_locked=is_locked, bitrate=voice.bitrate,
+        allow_list=sorted(allow),
+    )
+
+async def create_private_channel(member: discord.Member, preset: Optional[RoomPreset] = None) -> discord.VoiceChannel:
+    """Создание приватки одним запросом: пресет (имя, лимит, замок, allow-list, битрейт)
+    применяется сразу, без последующих voice.edit."""
     guild = member.guild
     category = await ensure_category(guild)
-    name = f"🎧 {sanitize_name(member.display_name)}"
+    name = render_room_name(member, preset)
+    locked = bool(preset and preset.is_locked)
     overwrites = {
         guild.default_role: discord.PermissionOverwrite(
-            view_channel=True, connect=True, send_messages=True
+            view_channel=True, connect=not locked, send_messages=True
         ),
         member: discord.PermissionOverwrite(
             view_channel=True, connect=True, manage_channels=True, move_members=True,
@@ -118,12 +193,20 @@ async def create_private_channel(member: discord.Member) -> discord.VoiceChannel
             send_messages=True, manage_messages=True
         ),
     }
+    kwargs = {}
+    if preset:
+        for uid in preset.allow_list:
+            if uid != member.id:
+                overwrites[discord.Object(id=uid)] = discord.PermissionOverwrite(view_channel=True, connect=True)
+        if preset.bitrate:
+            kwargs["bitrate"] = min(preset.bitrate, int(guild.bitrate_limit))
     voice = await guild.create_voice_channel(
         name=name,
         category=category,
-        user_limit=config.DEFAULT_LIMIT,
+        user_limit=preset.user_limit if preset else config.DEFAULT_LIMIT,
         overwrites=overwrites,
-        reason="Создание приватки"
+        reason="Создание приватки",
+        **kwargs
     )
     allowed = config.ALLOWED_ROLE
     for role in guild.roles:
@@ -143,7 +226,12 @@ async def move_safe(member: discord.Member, target: Optional[discord.VoiceChanne
         pass
 
 async def delete_private_channel(db: DB, voice: discord.VoiceChannel):
+    room = db.get_room(voice.id)
     db.del_room(voice.id)
+    panel_hashes.pop(voice.id, None)
+    journal = getattr(voice.guild._state._get_client(), "journal", None)
+    if journal and room:
+        journal.room_closed(voice.id, room.owner_id)
     try:
         await voice.delete(reason="Удаление пустой приватки")
     except Exception:
@@ -171,36 +259,30 @@ async def post_panel(guild: discord.Guild, voice: discord.VoiceChannel, owner: d
                 pass
             return None
 
-async def schedule_delete_if_empty(db: DB, voice: discord.VoiceChannel):
-    import logging, asyncio
-    logging.info("cleanup: schedule check for %s (%s) in %ss", voice.name, voice.id, config.DELETE_AFTER_EMPTY_SEC)
-    await asyncio.sleep(config.DELETE_AFTER_EMPTY_SEC)
+async def schedule_delete_if_empty(db: DB, voice: discord.VoiceChannel, delay: Optional[float] = None):
+    import logging
+    delay = config.DELETE_AFTER_EMPTY_SEC if delay is None else delay
+    logging.info("cleanup: schedule check for %s (%s) in %ss", voice.name, voice.id, delay)
+    # срок запоминаем, чтобы снапшот пережил его через рестарт
+    deadline = time.time() + delay
+    delete_deadlines[voice.id] = deadline
+    try:
+        await asyncio.sleep(delay)
+    finally:
+        if delete_deadlines.get(voice.id) == deadline:
+            delete_deadlines.pop(voice.id, None)
+    # удаляет только процесс, владеющий расписанием этой гильдии
+    from .leader import delete_lease
+    leader = getattr(voice.guild._state._get_client(), "leader", None)
+    if leader and not leader.holds(delete_lease(voice.guild.id)):
+        return
     ch = voice.guild.get_channel(voice.id)
     if ch and isinstance(ch, discord.VoiceChannel) and len(ch.members) == 0:
         logging.info("cleanup: deleting %s (%s)", ch.name, ch.id)
         await delete_private_channel(db, ch)
 
-async def rescan_and_repair(bot, db: DB):
-    """Восстановление состояния после рестарта:
-    - Удаляем записи из БД, если канал исчез.
-    - Если есть голосовые каналы '🎧 ' без записи — берём под управление.
-    - Репостим панели управления для всех активных приваток.
-    """
-    guild = bot.get_guild(config.GUILD_ID) if config.GUILD_ID else None
-    if not guild:
-        return
-
-    # 1) чистка отсутствующих
-    for room in db.list_rooms():
-        ch = guild.get_channel(room.voice_channel_id)
-        if not isinstance(ch, discord.VoiceChannel):
-            continue
-        owner = guild.get_member(room.owner_id)
-        if not owner:
-            continue
-        await upsert_panel(db, guild, ch, owner)
-
-    # 2) усыновление каналов по сигнатуре
+async def adopt_orphans(bot, db: DB, guild: discord.Guild) -> list[discord.VoiceChannel]:
+    """Берём под управление каналы '🎧 ' без записи в БД. Возвращает усыновлённые."""
     category = guild.get_channel(config.PRIVATE_CATEGORY_ID) if config.PRIVATE_CATEGORY_ID else None
     voice_candidates = []
     if isinstance(category, discord.CategoryChannel):
@@ -209,20 +291,48 @@ async def rescan_and_repair(bot, db: DB):
         voice_candidates = [ch for ch in guild.voice_channels if ch.name.startswith("🎧 ")]
 
     known_ids = {r.voice_channel_id for r in db.list_rooms()}
-    adopt = [ch for ch in voice_candidates if ch.id not in known_ids]
-    for ch in adopt:
+    adopted = []
+    for ch in voice_candidates:
+        if ch.id in known_ids:
+            continue
         # пытаемся определить владельца (первый участник, если есть; иначе — пропускаем)
         owner = ch.members[0] if ch.members else None
         if owner:
             db.add_room(ch.id, owner.id, None, is_locked=0, user_limit=ch.user_limit or config.DEFAULT_LIMIT)
+            journal = getattr(bot, "journal", None)
+            if journal:
+                journal.room_opened(ch.id, owner.id)
             await send_mod_log(bot, title="🍼 Усыновлена приватка", description=f"{ch.name} ({ch.id}) -> {owner.mention}")
+            adopted.append(ch)
+    return adopted
 
-    # 3) репост панелей
+async def rescan_and_repair(bot, db: DB):
+    """Восстановление состояния после рестарта:
+    - Удаляем записи из БД, если канал исчез.
+    - Если есть голосовые каналы '🎧 ' без записи — берём под управление.
+    - Репостим панели управления для всех активных приваток.
+    """
+    guild = bot.get_guild(config.GUILD_ID) if config.GUILD_ID else None
+    if not guild:
+        return
+
+    # 1) усыновление каналов по сигнатуре
+    shedder = getattr(bot, "shedder", None)
+    if shedder and not shedder.allows("adopt"):
+        # контроллер сам усыновит сирот, когда уровень опустится ниже CRITICAL
+        shedder.defer_adopt()
+    else:
+        await adopt_orphans(bot, db, guild)
+
+    # 2) репост панелей (один проход, с учётом деградации)
     for room in db.list_rooms():
         ch = guild.get_channel(room.voice_channel_id)
         if not isinstance(ch, discord.VoiceChannel):
             continue
-        owner = guild.get_member(room.owner_id)
+        if shedder and not shedder.allows("panel"):
+            shedder.defer_panel(ch.id)
+            continue
+        owner = await resolve_member(bot, guild, room.owner_id)
         if not owner:
             continue
         await upsert_panel(db, guild, ch, owner)
\ No newline at end of file
@@ -0,0 +1,132 @@
+from __future__ import annotations
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from typing import Optional, Tuple
+
+from .. import config
+
+_profile_lock = asyncio.Lock()
+
+
+def _collapse(frame) -> str:
+    """Стек в формате collapsed-stack (flamegraph.pl / speedscope): корень;...;лист."""
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+async def sample_profile(seconds: float, interval_ms: Optional[int] = None) -> Tuple[bytes, int]:
+    """Семплирующий профиль потока event loop на `seconds` секунд.
+    Возвращает (collapsed-stack файл, число семплов). Одновременно — только один профиль."""
+    interval = (interval_ms or config.PROFILE_INTERVAL_MS) / 1000
+    seconds = max(1.0, min(seconds, config.PROFILE_MAX_SEC))
+    loop_thread = threading.get_ident()
+    counts: Counter[str] = Counter()
+    stop = threading.Event()
+
+    def _sampler():
+        while not stop.wait(interval):
+            frame = sys._current_frames().get(loop_thread)
+            if frame is not None:
+                counts[_collapse(frame)] += 1
+
+    async with _profile_lock:
+        t = threading.Thread(target=_sampler, name="priv-profiler", daemon=True)
+        t.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            stop.set()
+            await asyncio.to_thread(t.join)
+
+    body = "\n".join(f"{stack} {n}" for stack, n in counts.most_common())
+    return body.encode("utf-8"), sum(counts.values())
+
+
+def rss_mb() -> float:
+    """Текущий RSS процесса в МБ (0, если платформа не даёт узнать)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except Exception:
+        try:
+            import resource
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        except Exception:
+            return 0.0
+
+
+class LoopWatchdog:
+    """Всегда включённый детектор медленных колбэков.
+
+    Event loop часто (шаг много меньше порога) обновляет метку времени; сторожевой
+    поток с тем же шагом проверяет, насколько она устарела, и при блокировке дольше
+    порога логирует стек потока loop — то есть обработчик (on_voice_state_update,
+    колбэк view, запрос к БД), который его держит, а после разблокировки — полную
+    длительность. В простое это один call_later и один wait в потоке на шаг.
+    """
+
+    def __init__(self, threshold_ms: Optional[int] = None):
+        self.threshold = (threshold_ms or config.SLOW_CALLBACK_MS) / 1000
+        # шаг много меньше порога: от него зависит точность (±шаг)
+        self._interval = min(self.threshold / 10, 0.05)
+        self._beat = time.monotonic()
+        self._last_gap = 0.0  # промежуток между двумя последними метками
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread or self.threshold <= 0:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._stop.clear()
+        self._tick()
+        self._thread = threading.Thread(target=self._watch, name="priv-loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._handle:
+            self._handle.cancel()
+            self._handle = None
+        self._thread = None
+
+    def _tick(self):
+        now = time.monotonic()
+        self._last_gap = now - self._beat
+        self._beat = now
+        self._handle = self._loop.call_later(self._interval, self._tick)
+
+    def _watch(self):
+        reported = False
+        while not self._stop.wait(self._interval):
+            # блокировка могла начаться сразу после метки, а заметить её мы можем
+            # с опозданием до одного шага опроса — поэтому порог срабатывания на шаг ниже,
+            # иначе блокировки чуть длиннее порога проскакивали бы между опросами
+            stale = time.monotonic() - self._beat
+            if stale >= self.threshold - self._interval:
+                if not reported:
+                    reported = True
+                    frame = sys._current_frames().get(self._loop_thread)
+                    stack = "".join(traceback.format_stack(frame)) if frame is not None else "<no frame>"
+                    logging.warning("slow callback: event loop blocked for %.0fms and counting\n%s",
+                                    stale * 1000, stack)
+                continue
+            if reported:
+                reported = False
+                # loop снова отбивает метки — промежуток между ними и есть полная длина стопа
+                logging.warning("slow callback: event loop unblocked after %.0fms", self._last_gap * 1000)
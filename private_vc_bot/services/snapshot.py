@@ -0,0 +1,138 @@
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Optional
+
+import discord
+from .. import config
+from ..db import DB
+from . import private_rooms as pr
+from .members import cached_member
+
+SNAPSHOT_VERSION = 1
+
+
+class StateSnapshot:
+    """Снимок рантайм-состояния для тёплого рестарта.
+
+    Пишется при штатной остановке и раз в SNAPSHOT_EVERY_SEC, читается при старте
+    одним чтением. Для каждой приватки хранит id сообщения панели и хэш последней
+    отрисовки: если по кэшу гильдии панель не изменилась, view просто регистрируется
+    заново без единого REST-запроса. Сроки удаления пустых переносятся через рестарт.
+    Антиспам-окна уже лежат в SQLite (`creations`, `blocks`) и в снимок не дублируются.
+    """
+
+    def __init__(self, bot, db: DB, path: Optional[str] = None):
+        self.bot = bot
+        self.db = db
+        self.path = path or config.SNAPSHOT_PATH
+        self._task: Optional[asyncio.Task] = None
+        self._started = False
+
+    # ---- запись
+    def collect(self) -> dict:
+        rooms = []
+        for room in self.db.list_rooms():
+            rooms.append({
+                "v": room.voice_channel_id,
+                "o": room.owner_id,
+                "pc": room.panel_channel_id,
+                "pm": room.panel_message_id,
+                "h": pr.panel_hashes.get(room.voice_channel_id),
+            })
+        return {
+            "version": SNAPSHOT_VERSION,
+            "guild_id": config.GUILD_ID,
+            "written_at": time.time(),
+            "rooms": rooms,
+            "deletions": {str(k): v for k, v in pr.delete_deadlines.items()},
+        }
+
+    def write(self):
+        # tmp уникален для процесса, даже если SNAPSHOT_PATH случайно общий
+        tmp = f"{self.path}.{''.join(c if c.isalnum() else '_' for c in config.INSTANCE_ID)}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.collect(), f, separators=(",", ":"))
+            os.replace(tmp, self.path)
+        except Exception:
+            logging.exception("snapshot: write failed (%s)", self.path)
+
+    def start(self):
+        if not self._task:
+            self._started = True
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        # до восстановления в памяти пусто — такой снимок затёр бы хороший
+        if self._started:
+            self.write()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(config.SNAPSHOT_EVERY_SEC)
+            self.write()
+
+    # ---- чтение
+    def load(self) -> Optional[dict]:
+        """Снимок или None, если его нет, он битый, чужой или устарел."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logging.exception("snapshot: unreadable %s", self.path)
+            return None
+        if data.get("version") != SNAPSHOT_VERSION or data.get("guild_id") != config.GUILD_ID:
+            return None
+        if time.time() - data.get("written_at", 0) > config.SNAPSHOT_MAX_AGE_SEC:
+            logging.info("snapshot: stale, falling back to full rescan")
+            return None
+        return data
+
+    def restore(self, data: dict) -> bool:
+        """Тёплый старт из снимка. Проверка идёт по кэшу гильдии, без REST:
+        панели с неизменным хэшем только перерегистрируются, остальные
+        уходят в одно обновление через контроллер нагрузки."""
+        guild = self.bot.get_guild(config.GUILD_ID) if config.GUILD_ID else None
+        if not guild:
+            return False
+        known = {r.voice_channel_id: r for r in self.db.list_rooms()}
+        hints = {item["v"]: item for item in data.get("rooms", [])}
+        registered = 0
+        stale = []
+        # источник истины — БД; снимок лишь подсказывает, что можно не трогать
+        for room in known.values():
+            item = hints.get(room.voice_channel_id, {})
+            ch = guild.get_channel(room.voice_channel_id)
+            if not isinstance(ch, discord.VoiceChannel):
+                continue  # приватка исчезла, пока бот был выключен
+            owner = cached_member(self.bot, guild, room.owner_id) or (ch.members[0] if ch.members else None)
+            if not owner:
+                continue
+            if room.panel_message_id and room.panel_message_id == item.get("pm"):
+                self.bot.add_view(pr._build_view(self.db, ch, owner), message_id=room.panel_message_id)
+                registered += 1
+                current = pr.panel_hash(ch, owner)
+                if item.get("h") == current:
+                    pr.panel_hashes[ch.id] = current
+                    continue
+            stale.append(ch.id)
+        # изменившиеся панели — одной последовательной догонялкой через контроллер нагрузки
+        self.bot.shedder.refresh_panels(stale)
+
+        now = time.time()
+        for voice_id, deadline in data.get("deletions", {}).items():
+            ch = guild.get_channel(int(voice_id))
+            if isinstance(ch, discord.VoiceChannel) and int(voice_id) in known and not ch.members:
+                asyncio.create_task(pr.schedule_delete_if_empty(self.db, ch, delay=max(0.0, deadline - now)))
+
+        logging.info("snapshot: warm start, %s panels re-registered, %s queued for refresh", registered, len(stale))
+        return True
@@ -2,8 +2,9 @@ from __future__ import annotations
 import discord
 from typing import List, Tuple
 from ..db import DB
-from ..services.private_rooms import apply_lock_state, delete_private_channel
+from ..services.private_rooms import apply_lock_state, delete_private_channel, preset_from_room
 from ..services.logging import send_mod_log
+from ..services.members import resolve_member
 from .. import config
 
 def _is_controller(member: discord.Member, owner_id: int) -> bool:
@@ -78,7 +79,7 @@ class TransferOwnerSelect(discord.ui.Select):
             return await interaction.response.send_message("Новый владелец должен быть в канале.", ephemeral=True)
 
         overwrites = voice.overwrites
-        old_owner = interaction.guild.get_member(room.owner_id)
+        old_owner = await resolve_member(interaction.client, interaction.guild, room.owner_id)
         if old_owner in overwrites:
             overwrites[old_owner] = discord.PermissionOverwrite(connect=True, view_channel=True)
         overwrites[new_owner] = discord.PermissionOverwrite(connect=True, view_channel=True, manage_channels=True, move_members=True)
@@ -122,7 +123,7 @@ class ControlView(discord.ui.View):
                                                            ephemeral=True)
 
         locked = not room.is_locked
-        await apply_lock_state(voice, locked, interaction.guild.get_member(room.owner_id))
+        await apply_lock_state(voice, locked, await resolve_member(interaction.client, interaction.guild, room.owner_id))
         self.db.set_locked(voice.id, int(locked))
         await send_mod_log(interaction.client, title="🔒 Смена статуса",
                            description=f"{voice.name}: {'закрыт' if locked else 'открыт'} (инициатор: {interaction.user.mention})")
@@ -148,3 +149,26 @@ class ControlView(discord.ui.View):
         await send_mod_log(interaction.client, title="👥 Изменён лимит",
                            description=f"{voice.name}: {limit_val} (инициатор: {interaction.user.mention})")
         await interaction.response.send_message(f"Лимит установлен: **{limit_val}**.", ephemeral=True)
+
+    @discord.ui.button(label="Сохранить пресет", style=discord.ButtonStyle.secondary, emoji="💾", custom_id="priv:preset_save")
+    async def save_preset(self, interaction: discord.Interaction, button: discord.ui.Button):
+        voice, room = self._get_context(interaction)
+        if not voice or not room:
+            return await interaction.response.send_message("Канал не найден.", ephemeral=True)
+
+        # пресет личный — сохранить его может только сам создатель
+        if interaction.user.id != room.owner_id:
+            return await interaction.response.send_message("Сохранить пресет может только создатель.", ephemeral=True)
+
+        preset = preset_from_room(self.db, voice, interaction.user, room.is_locked)
+        self.db.save_preset(preset)
+        await interaction.response.send_message(
+            f"💾 Пресет сохранён: лимит **{preset.user_limit or '∞'}**, "
+            f"{'закрыт 🔒' if preset.is_locked else 'открыт 🔓'}. Новые приватки будут создаваться с ним.",
+            ephemeral=True)
+
+    @discord.ui.button(label="Сбросить пресет", style=discord.ButtonStyle.secondary, emoji="♻️", custom_id="priv:preset_clear")
+    async def clear_preset(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.db.delete_presets(interaction.user.id)
+        await interaction.response.send_message("♻️ Пресет сброшен, новые приватки — с настройками по умолчанию.",
+                                                ephemeral=True)